@@ -1,7 +1,13 @@
 import sys
 import os
+import asyncio
+import logging
+from functools import lru_cache
+from prompt_toolkit import PromptSession
+from prompt_toolkit.formatted_text import ANSI
+from prompt_toolkit.history import FileHistory
 from flow import create_qa_flow
-from utils.call_llm import call_llm
+from utils.call_llm import call_llm, astream_llm, acall_openai, acall_anthropic, get_config, run_async
 
 # Terminal colors and styles
 class Colors:
@@ -17,31 +23,55 @@ class Colors:
 
 def clear_screen():
     """Clear the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    sys.stdout.write("\x1b[2J\x1b[H")
+    sys.stdout.flush()
+
+# Message templates, built once at import
+_BORDER = f"{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.ENDC}"
+_HEADER = f"\n{_BORDER}\n{Colors.BOLD}{Colors.HEADER}{{}}{Colors.ENDC}\n{_BORDER}\n\n"
+_SUCCESS = f"{Colors.GREEN}✓ {{}}{Colors.ENDC}\n"
+_ERROR = f"{Colors.RED}❌ {{}}{Colors.ENDC}\n"
+_INFO = f"{Colors.BLUE}ℹ {{}}{Colors.ENDC}\n"
+_PROMPT = f"{Colors.YELLOW}▶ {{}}{Colors.ENDC}"
+_SEP = f"{Colors.CYAN}{'─'*60}{Colors.ENDC}"
+_ANSWER_HDR = f"\n{Colors.GREEN}Answer:{Colors.ENDC}"
+_MENU = (
+    f"\n{Colors.CYAN}Choose an option:{Colors.ENDC}\n"
+    f"  {Colors.BOLD}1.{Colors.ENDC} Run Q&A mode\n"
+    f"  {Colors.BOLD}2.{Colors.ENDC} Test different LLM providers\n"
+    f"  {Colors.BOLD}3.{Colors.ENDC} Exit"
+)
 
 def print_header(text):
     """Print a styled header."""
-    print(f"\n{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.ENDC}")
-    print(f"{Colors.BOLD}{Colors.HEADER}{text.center(60)}{Colors.ENDC}")
-    print(f"{Colors.BOLD}{Colors.CYAN}{'='*60}{Colors.ENDC}\n")
+    sys.stdout.write(_HEADER.format(text.center(60)))
 
 def print_success(text):
     """Print success message."""
-    print(f"{Colors.GREEN}✓ {text}{Colors.ENDC}")
+    sys.stdout.write(_SUCCESS.format(text))
 
 def print_error(text):
     """Print error message."""
-    print(f"{Colors.RED}❌ {text}{Colors.ENDC}")
+    sys.stdout.write(_ERROR.format(text))
 
 def print_info(text):
     """Print info message."""
-    print(f"{Colors.BLUE}ℹ {text}{Colors.ENDC}")
+    sys.stdout.write(_INFO.format(text))
+
+@lru_cache(maxsize=None)
+def _session():
+    """Return the prompt session shared by every prompt, with persistent history."""
+    return PromptSession(history=FileHistory(os.path.expanduser("~/.nootron_history")))
 
 def print_prompt(text):
     """Print styled prompt."""
-    return input(f"{Colors.YELLOW}▶ {text}{Colors.ENDC}")
+    return _session().prompt(ANSI(_PROMPT.format(text)))
 
-def test_llm_direct():
+async def aprint_prompt(text):
+    """Print styled prompt without blocking the event loop."""
+    return await _session().prompt_async(ANSI(_PROMPT.format(text)))
+
+def test_llm_direct(provider="openai"):
     """Test the LLM directly without using the flow."""
     print_header("Direct LLM Test")
     print_info("Testing LLM connection...")
@@ -49,106 +79,129 @@ def test_llm_direct():
     try:
         # Test with a simple prompt
         test_prompt = "Say 'Hello! LLM is working!' if you can read this."
-        response = call_llm(test_prompt)
+        response = call_llm(test_prompt, provider=provider)
         print(f"\n{Colors.CYAN}LLM Response:{Colors.ENDC} {response}")
         print_success("LLM connection successful!")
         return True
     except Exception as e:
         print_error(f"Error connecting to LLM: {e}")
-        print("\n" + Colors.YELLOW + "Please check:" + Colors.ENDC)
+        print(f"\n{Colors.YELLOW}Please check:{Colors.ENDC}")
         print("  1. Your API keys are correctly set in the .env file")
         print("  2. You have installed all requirements: pip install -r requirements.txt")
         print("  3. Your internet connection is working")
         return False
 
-def run_qa_flow():
-    """Run the Q&A flow."""
+async def run_qa_flow_async():
+    """Run the Q&A flow on the event loop, streaming each answer."""
     clear_screen()
     print_header("Q&A Flow Mode")
     print_info("Type 'quit' to exit")
-    print(f"{Colors.CYAN}{'─'*60}{Colors.ENDC}\n")
+    print(_SEP, end="\n\n")
+    
+    # Shared state is created once and overwritten for each question
+    shared = {
+        "question": None,
+        "answer": None
+    }
     
     while True:
-        # Create fresh shared state for each question
-        shared = {
-            "question": None,
-            "answer": None
-        }
-        
         # Get user input
-        user_input = print_prompt("Enter your question (or 'quit'): ")
+        user_input = await aprint_prompt("Enter your question (or 'quit'): ")
         
         if user_input.lower() == 'quit':
-            print_info("Goodbye!")
+            print_info("Returning to the main menu.")
             break
         
+        shared["question"] = user_input
+        shared["answer"] = None
+        
         # For now, bypass the flow and use LLM directly
         # (since PocketFlow might not be installed properly)
         try:
-            print(f"\n{Colors.BLUE}Thinking...{Colors.ENDC}")
-            answer = call_llm(user_input)
-            print(f"\n{Colors.GREEN}Answer:{Colors.ENDC}")
-            print(f"{answer}\n")
-            print(f"{Colors.CYAN}{'─'*60}{Colors.ENDC}\n")
+            print(_ANSWER_HDR)
+            chunks = []
+            async for token in astream_llm(user_input, provider=get_config().default_provider):
+                sys.stdout.write(token)
+                sys.stdout.flush()
+                chunks.append(token)
+            shared["answer"] = "".join(chunks)
+            print("\n")
+            print(_SEP, end="\n\n")
         except Exception as e:
             print_error(f"Error: {e}")
             print_info("Make sure your API keys are set correctly.")
 
+def run_qa_flow():
+    """Run the Q&A flow."""
+    run_async(run_qa_flow_async())
+
+def menu_once():
+    """Show the menu and return the chosen option, or None to quit."""
+    print(_MENU)
+    
+    choice = print_prompt("\nEnter your choice (1-3): ")
+    return choice if choice in ("1", "2") else None
+
 def main():
     """Main function with improved user experience."""
+    if os.name == 'nt':
+        # Enables ANSI escape processing in the Windows console
+        os.system('')
     clear_screen()
     print_header("LLM Project CLI")
     print(f"{Colors.BOLD}Welcome to your LLM-powered application!{Colors.ENDC}\n")
     
-    # First, test if LLM is working
-    if not test_llm_direct():
+    # Fail fast on missing configuration, before any network call
+    provider = get_config().default_provider
+    if provider is None:
+        print_error("No API keys found. Set OPENAI_API_KEY or ANTHROPIC_API_KEY in your .env file.")
+        sys.exit(1)
+    
+    # First, test if LLM is working, using the provider that has a key
+    if not test_llm_direct(provider):
         print_error("\nExiting due to LLM connection error.")
         sys.exit(1)
     
-    # Show menu
-    print(f"\n{Colors.CYAN}Choose an option:{Colors.ENDC}")
-    print(f"  {Colors.BOLD}1.{Colors.ENDC} Run Q&A mode")
-    print(f"  {Colors.BOLD}2.{Colors.ENDC} Test different LLM providers")
-    print(f"  {Colors.BOLD}3.{Colors.ENDC} Exit")
+    # Sub-commands return here instead of re-entering main()
+    while True:
+        choice = menu_once()
+        if choice == "1":
+            run_qa_flow()
+        elif choice == "2":
+            test_providers()
+        else:
+            print_info("Goodbye!")
+            break
+
+async def _test_providers_async():
+    """Probe all providers concurrently, reporting each result independently."""
+    test_prompt = "What is 2+2? Answer with just the number."
+    providers = [("OpenAI", acall_openai), ("Anthropic", acall_anthropic)]
     
-    choice = print_prompt("\nEnter your choice (1-3): ")
+    print(f"\n{Colors.BLUE}Testing OpenAI GPT-4 and Anthropic Claude...{Colors.ENDC}")
+    results = await asyncio.gather(
+        *(call(test_prompt) for _, call in providers),
+        return_exceptions=True
+    )
     
-    if choice == "1":
-        run_qa_flow()
-    elif choice == "2":
-        test_providers()
-    else:
-        print_info("Goodbye!")
+    for (name, _), result in zip(providers, results):
+        if isinstance(result, Exception):
+            print_error(f"{name} Error: {result}")
+        else:
+            print_success(f"{name}: {result}")
 
 def test_providers():
     """Test different LLM providers."""
     clear_screen()
     print_header("Testing LLM Providers")
     
-    test_prompt = "What is 2+2? Answer with just the number."
-    
-    # Test OpenAI
-    try:
-        from utils.call_llm import call_openai
-        print(f"\n{Colors.BLUE}Testing OpenAI GPT-4...{Colors.ENDC}")
-        response = call_openai(test_prompt)
-        print_success(f"OpenAI: {response}")
-    except Exception as e:
-        print_error(f"OpenAI Error: {e}")
-    
-    # Test Anthropic
-    try:
-        from utils.call_llm import call_anthropic
-        print(f"\n{Colors.BLUE}Testing Anthropic Claude...{Colors.ENDC}")
-        response = call_anthropic(test_prompt)
-        print_success(f"Anthropic: {response}")
-    except Exception as e:
-        print_error(f"Anthropic Error: {e}")
+    run_async(_test_providers_async())
     
     print(f"\n{Colors.GREEN}Provider testing complete!{Colors.ENDC}")
-    print(f"{Colors.CYAN}{'─'*60}{Colors.ENDC}")
-    input(f"\n{Colors.YELLOW}Press Enter to continue...{Colors.ENDC}")
-    main()  # Return to main menu
+    print(_SEP)
+    print()
+    print_prompt("Press Enter to continue...")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     main()
\ No newline at end of file
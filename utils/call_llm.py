@@ -1,17 +1,290 @@
 import os
+import json
+import asyncio
 import logging
-from typing import Dict, List, Optional, Union
-from openai import OpenAI
-from anthropic import Anthropic
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Union
 from dotenv import load_dotenv
+from utils.llm_cache import LLMCache, get_cache
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODELS = {
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-opus-20240229",
+}
+
+# Seconds to wait on an LLM request. Set explicitly on the async clients,
+# which would otherwise adopt the shared http client's shorter timeout.
+LLM_TIMEOUT = 600.0
+
+@dataclass(frozen=True)
+class Config:
+    """Provider API keys from the environment; None when a key is not set."""
+    openai_key: Optional[str]
+    anthropic_key: Optional[str]
+    
+    @property
+    def default_provider(self) -> Optional[str]:
+        """The first provider with a key configured, or None if there is none."""
+        if self.openai_key:
+            return "openai"
+        if self.anthropic_key:
+            return "anthropic"
+        return None
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Read provider configuration from the environment once per process."""
+    openai_key = os.getenv("OPENAI_API_KEY")
+    return Config(
+        openai_key=None if not openai_key or openai_key == "YOUR_API_KEY_HERE" else openai_key,
+        anthropic_key=os.getenv("ANTHROPIC_API_KEY") or None
+    )
+
+def _openai_api_key() -> str:
+    api_key = get_config().openai_key
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables")
+    return api_key
+
+def _anthropic_api_key() -> str:
+    api_key = get_config().anthropic_key
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
+    return api_key
+
+def _build_request(
+    provider: str,
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """Build the keyword arguments for the provider's create call."""
+    if provider == "openai":
+        return {
+            "model": model or DEFAULT_MODELS["openai"],
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+    if provider == "anthropic":
+        # System prompts go in Anthropic's dedicated system parameter
+        request = {
+            "model": model or DEFAULT_MODELS["anthropic"],
+            "messages": [msg for msg in messages if msg["role"] != "system"],
+            "temperature": temperature,
+            "max_tokens": max_tokens or 4096,
+        }
+        system = "\n\n".join(msg["content"] for msg in messages if msg["role"] == "system")
+        if system:
+            request["system"] = system
+        return request
+    raise ValueError(f"Unsupported provider: {provider}")
+
+def _cache_payload(provider: str, prompt: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe a single-prompt request for the response cache."""
+    return {
+        "provider": provider,
+        "model": request["model"],
+        "temperature": request["temperature"],
+        "max_tokens": request["max_tokens"],
+        "prompt": prompt,
+    }
+
+def _response_text(provider: str, response) -> str:
+    """Extract the generated text from a provider response."""
+    if provider == "openai":
+        return response.choices[0].message.content
+    return response.content[0].text
+
+class _PreparedCall(NamedTuple):
+    """A provider request ready to send, plus its cache entry when caching applies."""
+    provider: str
+    request: Dict[str, Any]
+    cache: Optional[LLMCache]
+    payload: Optional[Dict[str, Any]]
+
+def _prepare_call(
+    provider: str,
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    cacheable: bool = False
+) -> _PreparedCall:
+    """Normalize the provider, build the request and decide whether to cache it."""
+    provider = provider.lower()
+    request = _build_request(provider, messages, model, temperature, max_tokens)
+    # Only deterministic (temperature 0) single-prompt calls use the cache
+    cache = None
+    if cacheable and temperature == 0:
+        try:
+            cache = get_cache()
+        except Exception as e:
+            logger.warning("LLM cache unavailable, calling without it: %s", e)
+    payload = _cache_payload(provider, messages[-1]["content"], request) if cache else None
+    return _PreparedCall(provider, request, cache, payload)
+
+def _prepare_prompt(
+    prompt: str,
+    provider: str,
+    model: Optional[str],
+    temperature: float,
+    max_tokens: Optional[int]
+) -> _PreparedCall:
+    """Prepare a cacheable single-prompt call."""
+    return _prepare_call(
+        provider,
+        [{"role": "user", "content": prompt}],
+        model, temperature, max_tokens,
+        cacheable=True
+    )
+
+def _prepare_history(messages: List[Dict[str, str]], provider: str, kwargs: Dict[str, Any]) -> _PreparedCall:
+    """Validate, log and prepare a call with full message history."""
+    if not messages:
+        raise ValueError("Messages list cannot be empty")
+    
+    logger.info("Calling %s with %d messages", provider, len(messages))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Messages: %s", json.dumps(messages))
+    
+    return _prepare_call(
+        provider,
+        messages,
+        kwargs.get("model"),
+        kwargs.get("temperature", 0.7),
+        kwargs.get("max_tokens")
+    )
+
+def _cached_response(call: _PreparedCall) -> Optional[str]:
+    """Return the cached response for call, or None on a miss."""
+    if not call.cache:
+        return None
+    # A broken cache must never fail the call; treat errors as a miss
+    try:
+        cached = call.cache.lookup(call.payload)
+    except Exception as e:
+        logger.warning("LLM cache lookup failed, treating as a miss: %s", e)
+        return None
+    if cached is not None:
+        logger.info("Serving cached response of length: %d", len(cached))
+    return cached
+
+def _finish_call(call: _PreparedCall, result: str) -> str:
+    """Cache and log a completed response, then return it."""
+    if call.cache:
+        try:
+            call.cache.store(call.payload, result)
+        except Exception as e:
+            logger.warning("LLM cache store failed, response not cached: %s", e)
+    logger.info("Received response of length: %d", len(result))
+    return result
+
+# Cache I/O and embedding are blocking, so the async paths run them in a
+# worker thread to keep other in-flight requests moving.
+async def _acached_response(call: _PreparedCall) -> Optional[str]:
+    """Async version of _cached_response."""
+    if not call.cache:
+        return None
+    return await asyncio.to_thread(_cached_response, call)
+
+async def _afinish_call(call: _PreparedCall, result: str) -> str:
+    """Async version of _finish_call."""
+    if not call.cache:
+        return _finish_call(call, result)
+    return await asyncio.to_thread(_finish_call, call, result)
+
+# The SDKs are imported on first use so only the provider actually called
+# pays its import cost.
+@lru_cache(maxsize=None)
+def _openai_client():
+    """Return the shared OpenAI client, validating the key on first use."""
+    from openai import OpenAI
+    return OpenAI(api_key=_openai_api_key())
+
+@lru_cache(maxsize=None)
+def _anthropic_client():
+    """Return the shared Anthropic client, validating the key on first use."""
+    from anthropic import Anthropic
+    return Anthropic(api_key=_anthropic_api_key())
+
+# Async clients hold connection pools bound to the event loop that opened
+# them, so they are kept per loop and must be closed before that loop ends:
+# run top-level coroutines through run_async, or await aclose_async_clients().
+_async_clients: Dict[asyncio.AbstractEventLoop, Dict[str, Any]] = {}
+
+def _async_client(provider: str):
+    """Return the async client for provider, shared within the running loop."""
+    from utils.http_client import async_http_client
+    
+    # Drop clients of loops that were closed without aclose_async_clients()
+    for loop in [loop for loop in _async_clients if loop.is_closed()]:
+        del _async_clients[loop]
+    
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if provider not in clients:
+        # Both SDKs share one tuned HTTP/2 pool on this loop
+        if provider == "openai":
+            from openai import AsyncOpenAI
+            clients[provider] = AsyncOpenAI(
+                api_key=_openai_api_key(),
+                http_client=async_http_client(),
+                timeout=LLM_TIMEOUT
+            )
+        else:
+            from anthropic import AsyncAnthropic
+            clients[provider] = AsyncAnthropic(
+                api_key=_anthropic_api_key(),
+                http_client=async_http_client(),
+                timeout=LLM_TIMEOUT
+            )
+    return clients[provider]
+
+async def aclose_async_clients() -> None:
+    """Close the async LLM clients opened on the running loop, if any."""
+    from utils.http_client import aclose_http_client
+    
+    for client in _async_clients.pop(asyncio.get_running_loop(), {}).values():
+        await client.close()
+    await aclose_http_client()
+
+def run_async(coro):
+    """
+    Run a coroutine with asyncio.run, closing the async LLM clients it
+    opened before the loop shuts down.
+    
+    Args:
+        coro: The top-level coroutine to run
+    
+    Returns:
+        The coroutine's result
+    """
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await aclose_async_clients()
+    
+    return asyncio.run(runner())
+
+def _create(provider: str, request: Dict[str, Any]):
+    if provider == "openai":
+        return _openai_client().chat.completions.create(**request)
+    return _anthropic_client().messages.create(**request)
+
+async def _acreate(provider: str, request: Dict[str, Any]):
+    client = _async_client(provider)
+    if provider == "openai":
+        return await client.chat.completions.create(**request)
+    return await client.messages.create(**request)
+
 def call_llm(
     prompt: str, 
     provider: str = "openai",
@@ -32,49 +305,132 @@ def call_llm(
     Returns:
         str: The LLM's response
     """
-    logger.info(f"Calling {provider} LLM with prompt length: {len(prompt)}")
+    logger.info("Calling %s LLM with prompt length: %d", provider, len(prompt))
     
     try:
-        if provider.lower() == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key or api_key == "YOUR_API_KEY_HERE":
-                raise ValueError("OPENAI_API_KEY not found in environment variables")
-            
-            client = OpenAI(api_key=api_key)
-            model = model or "gpt-4o"
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            result = response.choices[0].message.content
-            
-        elif provider.lower() == "anthropic":
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            if not api_key:
-                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-            
-            client = Anthropic(api_key=api_key)
-            model = model or "claude-3-opus-20240229"
-            
-            response = client.messages.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens or 4096
-            )
-            result = response.content[0].text
-            
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+        call = _prepare_prompt(prompt, provider, model, temperature, max_tokens)
+        cached = _cached_response(call)
+        if cached is not None:
+            return cached
+        
+        response = _create(call.provider, call.request)
+        return _finish_call(call, _response_text(call.provider, response))
+        
+    except Exception as e:
+        logger.error("Error calling %s LLM: %s", provider, e)
+        raise
+
+async def acall_llm(
+    prompt: str, 
+    provider: str = "openai",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None
+) -> str:
+    """
+    Async version of call_llm; several prompts can be awaited together
+    with asyncio.gather so their network round trips overlap.
+    
+    Takes the same arguments and returns the same value as call_llm.
+    """
+    logger.info("Calling %s LLM with prompt length: %d", provider, len(prompt))
+    
+    try:
+        call = _prepare_prompt(prompt, provider, model, temperature, max_tokens)
+        cached = await _acached_response(call)
+        if cached is not None:
+            return cached
         
-        logger.info(f"Received response of length: {len(result)}")
-        return result
+        response = await _acreate(call.provider, call.request)
+        return await _afinish_call(call, _response_text(call.provider, response))
         
     except Exception as e:
-        logger.error(f"Error calling {provider} LLM: {str(e)}")
+        logger.error("Error calling %s LLM: %s", provider, e)
+        raise
+
+def _stream(provider: str, request: Dict[str, Any]) -> Iterator[str]:
+    if provider == "openai":
+        stream = _openai_client().chat.completions.create(**request, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    else:
+        with _anthropic_client().messages.stream(**request) as stream:
+            yield from stream.text_stream
+
+def stream_llm(
+    prompt: str, 
+    provider: str = "openai",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Stream an LLM response, yielding text chunks as the provider sends them.
+    
+    Takes the same arguments as call_llm; the concatenated chunks equal
+    the string call_llm would return.
+    """
+    logger.info("Streaming %s LLM with prompt length: %d", provider, len(prompt))
+    
+    try:
+        call = _prepare_prompt(prompt, provider, model, temperature, max_tokens)
+        cached = _cached_response(call)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        for text in _stream(call.provider, call.request):
+            chunks.append(text)
+            yield text
+        _finish_call(call, "".join(chunks))
+        
+    except Exception as e:
+        logger.error("Error streaming %s LLM: %s", provider, e)
+        raise
+
+async def _astream(provider: str, request: Dict[str, Any]) -> AsyncIterator[str]:
+    client = _async_client(provider)
+    if provider == "openai":
+        stream = await client.chat.completions.create(**request, stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    else:
+        async with client.messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+async def astream_llm(
+    prompt: str, 
+    provider: str = "openai",
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Async version of stream_llm, for use with async for.
+    
+    Takes the same arguments and yields the same chunks as stream_llm.
+    """
+    logger.info("Streaming %s LLM with prompt length: %d", provider, len(prompt))
+    
+    try:
+        call = _prepare_prompt(prompt, provider, model, temperature, max_tokens)
+        cached = await _acached_response(call)
+        if cached is not None:
+            yield cached
+            return
+        
+        chunks = []
+        async for text in _astream(call.provider, call.request):
+            chunks.append(text)
+            yield text
+        await _afinish_call(call, "".join(chunks))
+        
+    except Exception as e:
+        logger.error("Error streaming %s LLM: %s", provider, e)
         raise
 
 # Convenience functions for specific providers
@@ -86,6 +442,14 @@ def call_anthropic(prompt: str, **kwargs) -> str:
     """Call Anthropic's Claude models."""
     return call_llm(prompt, provider="anthropic", **kwargs)
 
+async def acall_openai(prompt: str, **kwargs) -> str:
+    """Call OpenAI's GPT models asynchronously."""
+    return await acall_llm(prompt, provider="openai", **kwargs)
+
+async def acall_anthropic(prompt: str, **kwargs) -> str:
+    """Call Anthropic's Claude models asynchronously."""
+    return await acall_llm(prompt, provider="anthropic", **kwargs)
+
 # Support for chat history
 def call_llm_with_history(
     messages: List[Dict[str, str]], 
@@ -103,59 +467,163 @@ def call_llm_with_history(
     Returns:
         str: The LLM's response
     """
-    if not messages:
-        raise ValueError("Messages list cannot be empty")
-    
-    logger.info(f"Calling {provider} with {len(messages)} messages")
-    
     try:
-        if provider.lower() == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY not found in environment variables")
-            
-            client = OpenAI(api_key=api_key)
-            model = kwargs.get("model", "gpt-4o")
-            
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=kwargs.get("temperature", 0.7),
-                max_tokens=kwargs.get("max_tokens")
-            )
-            return response.choices[0].message.content
+        call = _prepare_history(messages, provider, kwargs)
+        response = _create(call.provider, call.request)
+        return _finish_call(call, _response_text(call.provider, response))
             
-        elif provider.lower() == "anthropic":
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            if not api_key:
-                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-            
-            client = Anthropic(api_key=api_key)
-            model = kwargs.get("model", "claude-3-opus-20240229")
-            
-            # Convert messages to Anthropic format
-            anthropic_messages = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    # Anthropic doesn't have system role, prepend to first user message
-                    if anthropic_messages and anthropic_messages[0]["role"] == "user":
-                        anthropic_messages[0]["content"] = msg["content"] + "\n\n" + anthropic_messages[0]["content"]
-                else:
-                    anthropic_messages.append(msg)
-            
-            response = client.messages.create(
-                model=model,
-                messages=anthropic_messages,
-                temperature=kwargs.get("temperature", 0.7),
-                max_tokens=kwargs.get("max_tokens", 4096)
-            )
-            return response.content[0].text
+    except Exception as e:
+        logger.error("Error calling %s with history: %s", provider, e)
+        raise
+
+async def acall_llm_with_history(
+    messages: List[Dict[str, str]], 
+    provider: str = "openai",
+    **kwargs
+) -> str:
+    """
+    Async version of call_llm_with_history.
+    
+    Takes the same arguments and returns the same value as call_llm_with_history.
+    """
+    try:
+        call = _prepare_history(messages, provider, kwargs)
+        response = await _acreate(call.provider, call.request)
+        return await _afinish_call(call, _response_text(call.provider, response))
             
     except Exception as e:
-        logger.error(f"Error calling {provider} with history: {str(e)}")
+        logger.error("Error calling %s with history: %s", provider, e)
         raise
 
+# Support for many prompts at once
+async def _openai_batch(requests: List[Dict[str, Any]], poll_interval: float) -> List[str]:
+    """Run requests as one OpenAI Batch API job and return texts in order."""
+    client = _async_client("openai")
+    lines = [
+        json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {k: v for k, v in request.items() if v is not None},
+        })
+        for i, request in enumerate(requests)
+    ]
+    batch_file = await client.files.create(
+        file=("batch.jsonl", "\n".join(lines).encode()),
+        purpose="batch"
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info("Submitted OpenAI batch %s with %d requests", batch.id, len(requests))
+    
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"OpenAI batch {batch.id} ended with status: {batch.status}")
+    
+    results = {}
+    output = await client.files.content(batch.output_file_id)
+    for line in output.text.splitlines():
+        item = json.loads(line)
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            raise RuntimeError(
+                f"OpenAI batch request {item['custom_id']} failed: "
+                f"{item.get('error') or response.get('body')}"
+            )
+        results[int(item["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+    if len(results) != len(requests):
+        raise RuntimeError(f"OpenAI batch {batch.id} returned {len(results)} of {len(requests)} results")
+    return [results[i] for i in range(len(requests))]
+
+async def _anthropic_batch(requests: List[Dict[str, Any]], poll_interval: float) -> List[str]:
+    """Run requests as one Anthropic Message Batch and return texts in order."""
+    client = _async_client("anthropic")
+    batch = await client.messages.batches.create(
+        requests=[{"custom_id": str(i), "params": request} for i, request in enumerate(requests)]
+    )
+    logger.info("Submitted Anthropic batch %s with %d requests", batch.id, len(requests))
+    
+    while batch.processing_status != "ended":
+        await asyncio.sleep(poll_interval)
+        batch = await client.messages.batches.retrieve(batch.id)
+    
+    results = {}
+    async for entry in await client.messages.batches.results(batch.id):
+        if entry.result.type != "succeeded":
+            raise RuntimeError(
+                f"Anthropic batch request {entry.custom_id} did not succeed: {entry.result.type}"
+            )
+        results[int(entry.custom_id)] = entry.result.message.content[0].text
+    if len(results) != len(requests):
+        raise RuntimeError(f"Anthropic batch {batch.id} returned {len(results)} of {len(requests)} results")
+    return [results[i] for i in range(len(requests))]
+
+async def acall_llm_batch(
+    prompts: List[str],
+    provider: str = "openai",
+    max_concurrency: int = 10,
+    use_batch_api: bool = False,
+    poll_interval: float = 30.0,
+    **kwargs
+) -> List[str]:
+    """
+    Call the LLM for a list of prompts.
+    
+    Args:
+        prompts: Prompts to send, one request each
+        provider: LLM provider to use
+        max_concurrency: Maximum requests in flight at once
+        use_batch_api: Submit one provider batch job instead (cheaper, but
+            can take up to 24 hours to complete)
+        poll_interval: Seconds between batch job status checks
+        **kwargs: model, temperature and max_tokens, as for call_llm
+    
+    Returns:
+        List[str]: The responses, in the same order as prompts
+    """
+    if not prompts:
+        return []
+    
+    if use_batch_api:
+        provider = provider.lower()
+        requests = [
+            _build_request(
+                provider,
+                [{"role": "user", "content": prompt}],
+                kwargs.get("model"),
+                kwargs.get("temperature", 0.7),
+                kwargs.get("max_tokens")
+            )
+            for prompt in prompts
+        ]
+        try:
+            if provider == "openai":
+                return await _openai_batch(requests, poll_interval)
+            return await _anthropic_batch(requests, poll_interval)
+        except Exception as e:
+            logger.error("Error running %s batch: %s", provider, e)
+            raise
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def call_one(prompt: str) -> str:
+        async with semaphore:
+            return await acall_llm(prompt, provider=provider, **kwargs)
+    
+    return await asyncio.gather(*(call_one(prompt) for prompt in prompts))
+
+def call_llm_batch(prompts: List[str], provider: str = "openai", **kwargs) -> List[str]:
+    """Synchronous wrapper around acall_llm_batch; takes the same arguments."""
+    return run_async(acall_llm_batch(prompts, provider=provider, **kwargs))
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     # Test the LLM call function
     test_prompt = "What is the meaning of life? Answer in one sentence."
     
@@ -174,6 +642,17 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Anthropic Error: {e}\n")
     
+    # Test both providers concurrently
+    try:
+        print("Testing async providers:")
+        async def _test_async():
+            return await asyncio.gather(acall_openai(test_prompt), acall_anthropic(test_prompt))
+        openai_response, anthropic_response = run_async(_test_async())
+        print(f"OpenAI: {openai_response}")
+        print(f"Anthropic: {anthropic_response}\n")
+    except Exception as e:
+        print(f"Async Error: {e}\n")
+    
     # Test with message history
     try:
         print("Testing with message history:")
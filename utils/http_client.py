@@ -0,0 +1,38 @@
+import asyncio
+from typing import Dict
+import httpx
+
+# Connection pools are bound to the event loop that opened them, so one
+# client is kept per loop. The pool references its loop, so it is never
+# freed implicitly: await aclose_http_client() before the loop finishes.
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+def async_http_client() -> httpx.AsyncClient:
+    """
+    Return the httpx client shared by all outbound calls on the running loop.
+    
+    HTTP/2 multiplexes concurrent requests to the same host over one
+    connection, and the raised pool limits keep large fan-outs (e.g.
+    call_llm_batch) from stalling on connection setup.
+    
+    Returns:
+        httpx.AsyncClient: The client for the current event loop
+    """
+    # Drop clients of loops that were closed without aclose_http_client()
+    for loop in [loop for loop in _clients if loop.is_closed()]:
+        del _clients[loop]
+    
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+            timeout=httpx.Timeout(60.0)
+        )
+    return _clients[loop]
+
+async def aclose_http_client() -> None:
+    """Close the running loop's shared client and its sockets, if one was opened."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup, falls back to the stdlib encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "nootron", "llm_cache.sqlite3")
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+class LLMCache:
+    """
+    Two-tier response cache for LLM calls, stored in SQLite (WAL mode).
+
+    The exact tier is keyed by a SHA-256 hash of the full request. The
+    optional semantic tier embeds the prompt with sentence-transformers and
+    returns the closest cached response from the same provider/model when
+    its cosine similarity reaches the threshold.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        semantic: bool = False,
+        threshold: float = 0.92,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.threshold = threshold
+        self.embedding_model = embedding_model
+        # Guards the SQLite connection; the semantic tier has its own lock
+        # for the encoder and in-memory indexes
+        self._lock = threading.Lock()
+        self._semantic_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "scope TEXT NOT NULL, prompt TEXT NOT NULL, vector BLOB NOT NULL, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+        self.semantic = semantic
+        self._encoder = None
+        # scope -> (faiss index, cached responses in index order)
+        self._indexes: Dict[str, Tuple[Any, List[str]]] = {}
+
+    @staticmethod
+    def cache_key(payload: Dict[str, Any]) -> str:
+        """Return the SHA-256 hex digest of the canonical JSON payload."""
+        if orjson is not None:
+            encoded = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        else:
+            # Same bytes as orjson, so keys are stable whichever is installed
+            encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def lookup(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Return a cached response for the request payload, if any."""
+        result = self.get(self.cache_key(payload))
+        if result is None and self.semantic:
+            try:
+                with self._semantic_lock:
+                    result = self._semantic_get(payload)
+            except ImportError as e:
+                self._disable_semantic(e)
+        return result
+
+    def store(self, payload: Dict[str, Any], value: str) -> None:
+        """Cache the response for the request payload in every enabled tier."""
+        self.set(self.cache_key(payload), value)
+        if self.semantic:
+            try:
+                with self._semantic_lock:
+                    self._semantic_set(payload, value)
+            except ImportError as e:
+                self._disable_semantic(e)
+
+    # Semantic tier
+
+    def _disable_semantic(self, error: ImportError) -> None:
+        """Fall back to exact matching when the embedding deps are missing."""
+        logger.warning(
+            "Semantic LLM cache needs sentence-transformers and faiss-cpu (%s); using exact matches only",
+            error
+        )
+        self.semantic = False
+
+    @staticmethod
+    def _scope(payload: Dict[str, Any]) -> str:
+        """Hash every request field except the prompt itself."""
+        return LLMCache.cache_key({k: v for k, v in payload.items() if k != "prompt"})
+
+    def _embed(self, text: str):
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer
+            self._encoder = SentenceTransformer(self.embedding_model)
+        return self._encoder.encode([text], normalize_embeddings=True).astype("float32")
+
+    def _index(self, scope: str, dim: int) -> Tuple[Any, List[str]]:
+        """Return the FAISS index for scope, loading it from SQLite on first use."""
+        if scope not in self._indexes:
+            import faiss
+            import numpy as np
+
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT vector, value FROM embeddings WHERE scope = ? ORDER BY rowid", (scope,)
+                ).fetchall()
+            index = faiss.IndexFlatIP(dim)
+            if rows:
+                index.add(np.stack([np.frombuffer(vector, dtype="float32") for vector, _ in rows]))
+            self._indexes[scope] = (index, [value for _, value in rows])
+        return self._indexes[scope]
+
+    def _semantic_get(self, payload: Dict[str, Any]) -> Optional[str]:
+        vector = self._embed(payload["prompt"])
+        index, values = self._index(self._scope(payload), vector.shape[1])
+        if not values:
+            return None
+        scores, ids = index.search(vector, 1)
+        if scores[0][0] >= self.threshold:
+            logger.info("Semantic cache hit with similarity %.3f", scores[0][0])
+            return values[ids[0][0]]
+        return None
+
+    def _semantic_set(self, payload: Dict[str, Any], value: str) -> None:
+        scope = self._scope(payload)
+        vector = self._embed(payload["prompt"])
+        index, values = self._index(scope, vector.shape[1])
+        index.add(vector)
+        values.append(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO embeddings (scope, prompt, vector, value) VALUES (?, ?, ?, ?)",
+                (scope, payload["prompt"], vector[0].tobytes(), value)
+            )
+            self._conn.commit()
+
+@lru_cache(maxsize=None)
+def get_cache() -> Optional[LLMCache]:
+    """
+    Return the process-wide cache, or None unless LLM_CACHE=1.
+
+    LLM_CACHE_SEMANTIC=1 additionally enables the semantic tier and
+    LLM_CACHE_PATH overrides the SQLite file location.
+    """
+    if os.getenv("LLM_CACHE") != "1":
+        return None
+    return LLMCache(
+        path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+        semantic=os.getenv("LLM_CACHE_SEMANTIC") == "1"
+    )
@@ -1,23 +1,66 @@
-import requests
+import os
+import asyncio
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from utils.http_client import aclose_http_client, async_http_client
 
-def search_web(query):
+# Load environment variables from .env file
+load_dotenv()
+
+BRAVE_SEARCH_URL = "https://api.search.brave.com/res/v1/web/search"
+
+# Results for recently seen queries, keyed by normalized query
+_cache = TTLCache(maxsize=1024, ttl=3600)
+
+def _normalize(query):
+    return " ".join(query.lower().split())
+
+async def search_web(query, count=5):
     """
-    Search the web using a search API.
-    This is a placeholder implementation - replace with actual search API.
+    Search the web using the Brave Search API.
+    Repeated queries within an hour are answered from an in-memory cache.
     
     Args:
         query (str): Search query
+        count (int): Maximum number of results to return
     
     Returns:
-        str: Search results
+        str: Search results, one title/URL/description block per result
     """
-    # Example implementation - replace with actual search API
-    # You might use Google Custom Search API, Bing API, or similar
+    key = (_normalize(query), count)
+    if key in _cache:
+        return _cache[key]
     
-    # Placeholder response
-    return f"Search results for: {query}\n\n[Implement actual search API integration here]"
+    api_key = os.getenv("BRAVE_KEY")
+    if not api_key:
+        raise ValueError("BRAVE_KEY not found in environment variables")
+    
+    response = await async_http_client().get(
+        BRAVE_SEARCH_URL,
+        params={"q": query, "count": count},
+        headers={"Accept": "application/json", "X-Subscription-Token": api_key},
+        timeout=10.0
+    )
+    response.raise_for_status()
+    
+    results = response.json().get("web", {}).get("results", [])
+    if not results:
+        formatted = f"No search results for: {query}"
+    else:
+        formatted = "\n\n".join(
+            f"{r.get('title', '')}\n{r.get('url', '')}\n{r.get('description', '')}"
+            for r in results
+        )
+    
+    _cache[key] = formatted
+    return formatted
 
 if __name__ == "__main__":
     # Test the search function
-    query = "LLM frameworks comparison"
-    print(search_web(query))
\ No newline at end of file
+    async def _test():
+        try:
+            return await search_web("LLM frameworks comparison")
+        finally:
+            await aclose_http_client()
+    
+    print(asyncio.run(_test()))
\ No newline at end of file